@@ -17,27 +17,62 @@
 
 import csv
 import datetime
+import functools
+import io
 import logging
+import os
+import pickle
 import re
 import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # https://pyyaml.org/wiki/PyYAMLDocumentation
-from yaml import Loader, load
+from yaml import load
+
+try:
+    # Use the fast libyaml based loader, if available
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
+    LIBYAML = False
+else:
+    LIBYAML = True
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    filename='device_info.log',
-    filemode='w',
-)
 log = logging.getLogger(__name__)
 
 LINEAGE_OS_VERSIONS = {16, 17}
-INFO_TEMPLATE = '''{vendor} {name} - https://wiki.lineageos.org/devices/{codename}'''
+WIKI_DEVICE_URL_PREFIX = 'https://wiki.lineageos.org/devices/'
+INFO_TEMPLATE = '%(vendor)s %(name)s - ' + WIKI_DEVICE_URL_PREFIX + '%(codename)s'  # for lazy log formatting
 README_TOP10_HEADLINE = '=== top 10 devices'
+# The top 10 section: from the headline to the next headline (or the end of the README):
+README_TOP10_RE = re.compile(rf'^{re.escape(README_TOP10_HEADLINE)}$.*?(?=^==|\Z)', re.DOTALL | re.MULTILINE)
+SCREEN_INCHES_RE = re.compile(r'([\d.]+)\s*in')
+SKIP_RAM = frozenset({'1 GB', '2 GB'})
+SKIP_STORAGE = frozenset({'8 GB', '16 GB'})
+UNKNOWN_REMOVABLE_BATTERY = '???'
+
+# Match the whole "versions" list in flow style (e.g.: "versions: [14.1, 15.1]") or block style.
+# Block style only matches if all items are plain numbers up to the next top-level key (or the end),
+# so that a quoted item or a comment never results in a partial version set:
+RAW_VERSIONS_RE = re.compile(
+    rb'^versions:('
+    rb'[ \t]*\[[\d.,\s\'"]*\]'
+    rb'|(?:\n[ \t]*-[ \t]*[\d.]+[ \t]*)+(?=\s*\n[^\s#\'"-]|\s*\Z)'
+    rb')',
+    re.MULTILINE,
+)
+RAW_MAJOR_VERSION_RE = re.compile(rb'(\d+)(?:\.\d+)?')
+RAW_VENDOR_SHORT_RE = re.compile(rb'^vendor_short:[ \t]*(.*?)[ \t]*$', re.MULTILINE)
+RAW_NAME_RE = re.compile(rb'^name:[ \t]*(.*?)[ \t]*$', re.MULTILINE)
 
 GIT_BIN = shutil.which('git')
+GIT_COMMIT_PREFIX = 'COMMIT '
+
+# Part of the device cache file name: Increase it on every change of the read/peek/parse logic!
+DEVICE_CACHE_VERSION = 2
 
 
 class CsvGenerator:
@@ -57,48 +92,61 @@ class CsvGenerator:
     HEADER_WIKI_DATE = 'Wiki mod.Date'
     HEADER_WIKI_LINK = 'Wiki Link'
 
+    FIELDNAMES = (  # Note: Order here is the order in the CVS file!
+        HEADER_VENDOR,
+        HEADER_NAME,
+        HEADER_RELEASE,
+        HEADER_SCREEN,
+        HEADER_RAM,
+        HEADER_STORAGE,
+        HEADER_REMOVEABLE_BATTERY,
+        HEADER_MAINTAINER_COUNT,
+        HEADER_CODENAME,
+        HEADER_MODELS,
+        HEADER_SOC,
+        HEADER_VERSIONS,
+        HEADER_WIKI_DATE,
+        HEADER_WIKI_LINK,
+    )
+
     def __init__(self, *, csv_file):
 
         self.csv_file = csv_file
 
-        fieldnames = [  # Note: Order here is the order in the CVS file!
-            self.HEADER_VENDOR,
-            self.HEADER_NAME,
-            self.HEADER_RELEASE,
-            self.HEADER_SCREEN,
-            self.HEADER_RAM,
-            self.HEADER_STORAGE,
-            self.HEADER_REMOVEABLE_BATTERY,
-            self.HEADER_MAINTAINER_COUNT,
-            self.HEADER_CODENAME,
-            self.HEADER_MODELS,
-            self.HEADER_SOC,
-            self.HEADER_VERSIONS,
-            self.HEADER_WIKI_DATE,
-            self.HEADER_WIKI_LINK,
-        ]
-
-        self.csv_writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-        self.csv_writer.writeheader()
-
-    def add_device(self, device):
-        row = {  # Note: Order is *not* important here!
-            self.HEADER_VENDOR: device.lineageos_data['vendor_short'].capitalize(),
-            self.HEADER_NAME: device.lineageos_data['name'],
-            self.HEADER_MAINTAINER_COUNT: device.lineageos_data['maintainer_count'],
-            self.HEADER_CODENAME: device.lineageos_data['codename'],
-            self.HEADER_REMOVEABLE_BATTERY: device.lineageos_data['removable_battery'],
-            self.HEADER_RELEASE: device.lineageos_data['release'],
-            self.HEADER_SCREEN: device.lineageos_data['screen'],
-            self.HEADER_MODELS: ','.join([x for x in device.lineageos_data.get('models', '')]),
-            self.HEADER_RAM: device.lineageos_data['ram'],
-            self.HEADER_STORAGE: device.lineageos_data['storage'],
-            self.HEADER_SOC: device.lineageos_data['soc'],
-            self.HEADER_VERSIONS: device.lineageos_data['versions'],
-            self.HEADER_WIKI_DATE: device.wiki_commit_date,
-            self.HEADER_WIKI_LINK: device.lineageos_wiki_link,
-        }
-        self.csv_writer.writerow(row)
+        self.csv_writer = csv.writer(csv_file)
+        self.rows = [self.FIELDNAMES]  # All rows will be written in finalize()
+
+    @staticmethod
+    def build_row(device):
+        data = device.lineageos_data
+
+        models = data.get('models') or ()
+        if isinstance(models, str):  # Don't join the characters of a single model name
+            models = (models,)
+
+        return (  # Note: Order must match the FIELDNAMES order!
+            data['vendor_short'].capitalize(),
+            data['name'],
+            data['release'],
+            data['screen'],
+            data['ram'],
+            data['storage'],
+            data['removable_battery'],
+            data['maintainer_count'],
+            data['codename'],
+            ','.join(models),
+            data['soc'],
+            data['versions'],
+            device.wiki_commit_date,
+            device.lineageos_wiki_link,
+        )
+
+    def add_row(self, row):
+        self.rows.append(row)
+
+    def finalize(self):
+        self.csv_writer.writerows(self.rows)
+        self.rows.clear()
 
 
 class MultiCsvFile:
@@ -109,70 +157,145 @@ class MultiCsvFile:
         self.versions = versions
 
     def __enter__(self):
-        self.files = []
-        self.csv_generators = {}
-        for version in self.versions:
+        self.csv_files = {}  # file path -> StringIO buffer
+        self.csv_generators = {}  # The CSV files will be created on first use
+        return self
+
+    def get_csv_generator(self, version):
+        try:
+            return self.csv_generators[version]
+        except KeyError:
             filename = self.filename_template.format(version=version)
             file_path = Path(self.path, filename)
-            csv_file = file_path.open('w')
-            self.files.append(csv_file)
-            self.csv_generators[version] = CsvGenerator(csv_file=csv_file)
-        return self
+            csv_file = self.csv_files[file_path] = io.StringIO()
+            csv_generator = self.csv_generators[version] = CsvGenerator(csv_file=csv_file)
+            return csv_generator
 
-    def add_device(self, version, device):
-        csv_generator = self.csv_generators[version]
-        csv_generator.add_device(device)
+    def add_device(self, versions, device):
+        row = CsvGenerator.build_row(device)  # The row is the same for all versions
+        for version in versions:
+            csv_generator = self.get_csv_generator(version)
+            csv_generator.add_row(row)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        for csv_generator in self.csv_generators.values():
+            csv_generator.finalize()
+
         print()
-        for f in self.files:
-            f.close()
-            print(f' *** file generated: {f.name} ***')
+        for file_path, csv_file in self.csv_files.items():
+            # Write bytes: The csv module creates the line endings itself
+            file_path.write_bytes(csv_file.getvalue().encode('utf-8'))
+            print(f' *** file generated: {file_path} ***')
+
+
+def get_screen_inches(screen):
+    """
+    Returns the first "<number> in" size from the screen info or None
+    """
+    if isinstance(screen, str):
+        match = SCREEN_INCHES_RE.search(screen)
+        return match.group(1) if match else None
+
+    if isinstance(screen, dict):
+        screen = screen.values()
+    elif not isinstance(screen, list):
+        return None
+
+    for info in screen:
+        inches = get_screen_inches(info)
+        if inches:
+            return inches
+    return None
+
+
+def get_removeable_info(battery):
+    """
+    Returns True/False from the battery info or UNKNOWN_REMOVABLE_BATTERY
+    Lists and per model infos (e.g.: [{A3000: {removable: False}}, ...]) are searched recursively:
+    if one variant is removable, True is returned.
+    """
+    if isinstance(battery, dict):
+        if 'removable' in battery:
+            removable = battery['removable']
+            return removable if isinstance(removable, bool) else UNKNOWN_REMOVABLE_BATTERY
+        battery = battery.values()
+    elif not isinstance(battery, list):  # e.g.: battery: None
+        return UNKNOWN_REMOVABLE_BATTERY
+
+    removable_infos = {get_removeable_info(info) for info in battery}
+    if True in removable_infos:
+        return True
+    if False in removable_infos:
+        return False
+    return UNKNOWN_REMOVABLE_BATTERY
+
+
+def make_short_name(vendor_short, name):
+    return f'{vendor_short} {name}'.capitalize()
 
 
 class Device:
+    __slots__ = (
+        'lineageos_versions',
+        'wiki_commit_date',
+        '_short_name',
+        'lineageos_data',
+        'filtered_lineageos_version',
+        'lineageos_wiki_link',
+    )
+
     def __init__(self, lineageos_versions, wiki_commit_date):
         self.lineageos_versions = lineageos_versions
         self.wiki_commit_date = wiki_commit_date
-        self.short_name = None
+        self._short_name = None
         self.lineageos_data = {}
 
-    def __lt__(self, other):
-        if self.lineageos_data['maintainer_count'] != other.lineageos_data['maintainer_count']:
-            return self.lineageos_data['maintainer_count'] > other.lineageos_data['maintainer_count']
-
-        return self.short_name < other.short_name
+    @property
+    def short_name(self):
+        """
+        Created on first use: skipped devices only need it in the skip log.
+        """
+        if self._short_name is None:
+            self._short_name = make_short_name(self.lineageos_data['vendor_short'], self.lineageos_data['name'])
+        return self._short_name
+
+    def sort_key(self):
+        """
+        Most maintainers first, then by name. Use e.g.: sorted(devices, key=Device.sort_key)
+        """
+        return -self.lineageos_data['maintainer_count'], self.short_name
 
     def __str__(self):
         return f'{self.short_name} ({self.lineageos_data["maintainer_count"]} maintainers)'
 
     def load_lineageos_wiki_data(self, data):
-        self.short_name = '{vendor_short} {name}'.format(**data).capitalize()
         self.lineageos_data = data
 
         self.lineageos_data['maintainer_count'] = len(self.lineageos_data['maintainers'])
-        self.lineageos_data['versions'] = {int(ver) for ver in self.lineageos_data['versions']}
+        # float() first: quoted versions like '16.0' are strings
+        self.lineageos_data['versions'] = set(map(int, map(float, self.lineageos_data['versions'])))
         self.filtered_lineageos_version = self.lineageos_data['versions'] & self.lineageos_versions
-        self.lineageos_wiki_link = f'https://wiki.lineageos.org/devices/{self.lineageos_data["codename"]}'
-
-        screen = self.lineageos_data['screen']
-        if screen:
-            try:
-                inches = re.findall(r'([\d\.]+) in', repr(screen))[0]
-            except IndexError:
-                pass
-            else:
-                self.lineageos_data['screen'] = inches
-
-        battery = repr(self.lineageos_data.get('battery'))
-        if "'removable': True" in battery:
-            self.lineageos_data['removable_battery'] = True
-        elif "'removable': False" in battery:
-            self.lineageos_data['removable_battery'] = False
-        else:
-            self.lineageos_data['removable_battery'] = '???'
+        self.lineageos_wiki_link = WIKI_DEVICE_URL_PREFIX + self.lineageos_data['codename']
+
+    def load_details(self):
+        """
+        Prepare the screen and battery info, only needed for devices that are not skipped.
+        """
+        inches = get_screen_inches(self.lineageos_data['screen'])
+        if inches:
+            self.lineageos_data['screen'] = inches
 
-        print(INFO_TEMPLATE.format(**self.lineageos_data))
+        self.load_battery_info()
+
+        log.debug(INFO_TEMPLATE, self.lineageos_data)
+
+    def load_battery_info(self):
+        battery = self.lineageos_data.get('battery')
+        if isinstance(battery, list) and len(battery) == 1:
+            # Only one (maybe per model) battery info: No need to collect the infos of all variants
+            battery = battery[0]
+
+        self.lineageos_data['removable_battery'] = get_removeable_info(battery)
 
     def skip_device(self):
         if self.lineageos_data['maintainer_count'] < 1:
@@ -184,49 +307,193 @@ class Device:
             return True
 
         ram = self.lineageos_data['ram']
-        if ram in ('1 GB', '2 GB'):
+        if ram in SKIP_RAM:
             log.info('Skip %r: Only %r RAM', self.short_name, ram)
             return True
 
         storage = self.lineageos_data['storage']
-        if storage in ('8 GB', '16 GB'):
+        if storage in SKIP_STORAGE:
             log.info('Skip %r: Only %r Storage', self.short_name, storage)
             return True
 
         return False  # Keep this device
 
 
-def get_git_commit_date(wiki_devices_path, item):
-    item_path = item.relative_to(wiki_devices_path)
-    popenargs = [GIT_BIN, 'log', '-1', '--format="%cd"', '--date=short', str(item_path)]
+def peek_lineageos_versions(raw_device_data):
+    """
+    Returns the major LineageOS versions from the raw YAML content
+    without parsing the whole file. None if the complete versions list can't be found.
+    """
+    match = RAW_VERSIONS_RE.search(raw_device_data)
+    if not match:
+        return None
+    return {int(ver) for ver in RAW_MAJOR_VERSION_RE.findall(match.group(1))}
+
+
+def peek_short_name(raw_device_data):
+    """
+    Returns the device short name from the raw YAML content (only for logging)
+    without parsing the whole file. None if vendor or name can't be found.
+    """
+    values = []
+    for regex in (RAW_VENDOR_SHORT_RE, RAW_NAME_RE):
+        match = regex.search(raw_device_data)
+        if not match:
+            return None
+        values.append(match.group(1).decode('utf-8').strip().strip('\'"'))
+    return make_short_name(*values)
+
+
+class SkippedDevice:
+    """
+    Returned by read_device_file() for a device that was skipped without parsing the YAML file.
+    """
+    __slots__ = ('short_name',)
+
+    def __init__(self, short_name):
+        self.short_name = short_name
+
+
+def read_device_file(file_path, lineageos_versions):
+    """
+    Read and parse one device YAML file (called in worker processes).
+    Returns a SkippedDevice if the device doesn't support one of the given LineageOS versions.
+    """
+    with open(file_path, 'rb') as f:
+        raw_device_data = f.read()
+
+    # Skip unsupported devices before parsing the whole YAML file:
+    raw_versions = peek_lineageos_versions(raw_device_data)
+    if raw_versions is not None and not raw_versions & lineageos_versions:
+        return SkippedDevice(short_name=peek_short_name(raw_device_data))
+
+    # libyaml detects the encoding (UTF-8) itself:
+    return load(raw_device_data, Loader=Loader)
+
+
+def get_git_commit_dates(wiki_devices_path):
+    """
+    Returns the last commit date of all files in the devices directory,
+    collected with one "git log" call (newest commits are listed first).
+    """
+    popenargs = [
+        GIT_BIN, 'log', '--name-only', '--relative', f'--format={GIT_COMMIT_PREFIX}%cd', '--date=short', '--', '.'
+    ]
     # print(' '.join(popenargs))
-    raw_commit_date = subprocess.check_output(popenargs, cwd=wiki_devices_path, universal_newlines=True)
-    commit_date = raw_commit_date.strip().strip('"\'')
-    return commit_date
+    git_log = subprocess.check_output(popenargs, cwd=wiki_devices_path, universal_newlines=True)
+
+    commit_dates = {}
+    commit_date = None
+    for line in git_log.splitlines():
+        if line.startswith(GIT_COMMIT_PREFIX):
+            commit_date = line[len(GIT_COMMIT_PREFIX):]
+        elif line:
+            commit_dates.setdefault(line, commit_date)
+    return commit_dates
+
+
+def read_wiki_devices(wiki_devices_path, lineageos_versions):
+    """
+    Returns the parsed YAML data as (file name, data) tuples and the git commit dates.
+    """
+    with os.scandir(wiki_devices_path) as it:
+        entries = [entry for entry in it if entry.name.endswith('.yml') and entry.is_file()]
+    file_paths = [entry.path for entry in entries]
+
+    read_func = functools.partial(read_device_file, lineageos_versions=lineageos_versions)
+    with ProcessPoolExecutor() as executor:
+        # The YAML files are parsed in the worker processes, while we run "git log":
+        results = executor.map(read_func, file_paths, chunksize=16)
+        commit_dates = get_git_commit_dates(wiki_devices_path)
+
+        device_datas = [(entry.name, device_data) for entry, device_data in zip(entries, results)]
+
+    return device_datas, commit_dates
+
+
+def get_git_head(wiki_devices_path):
+    popenargs = [GIT_BIN, 'rev-parse', 'HEAD']
+    return subprocess.check_output(popenargs, cwd=wiki_devices_path, universal_newlines=True).strip()
+
+
+def is_git_dirty(wiki_devices_path):
+    """
+    True if there are uncommitted changes (or untracked files) in the devices directory.
+    """
+    popenargs = [GIT_BIN, 'status', '--porcelain', '--', '.']
+    return bool(subprocess.check_output(popenargs, cwd=wiki_devices_path, universal_newlines=True).strip())
+
+
+def load_wiki_devices(wiki_devices_path, lineageos_versions, cache_path):
+    """
+    Same as read_wiki_devices(), but cache the result in a pickle file.
+    The file name contains the git HEAD of the wiki, so a wiki update invalidates the cache,
+    and DEVICE_CACHE_VERSION, so a change of the parse logic invalidates it, too.
+    The cache is not used if the wiki devices directory contains local changes.
+    """
+    if cache_path is None:
+        return read_wiki_devices(wiki_devices_path, lineageos_versions)
+
+    if is_git_dirty(wiki_devices_path):
+        print('Wiki devices directory contains local changes: Ignore the device cache.')
+        return read_wiki_devices(wiki_devices_path, lineageos_versions)
+
+    git_head = get_git_head(wiki_devices_path)
+    versions = '-'.join(str(version) for version in sorted(lineageos_versions))
+    cache_file_path = Path(cache_path, f'devices-v{DEVICE_CACHE_VERSION}-{git_head}-{versions}.pkl')
+    if cache_file_path.is_file():
+        try:
+            with cache_file_path.open('rb') as f:
+                result = pickle.load(f)
+        except Exception as err:  # e.g.: truncated file -> handle as cache miss
+            print(f'Ignore broken cache file {cache_file_path}: {err}')
+        else:
+            print(f'Use cached device data from: {cache_file_path}')
+            return result
+
+    result = read_wiki_devices(wiki_devices_path, lineageos_versions)
 
+    # Write to a temp file first, so that an interrupted run leaves no truncated cache file:
+    cache_path.mkdir(parents=True, exist_ok=True)
+    fd, temp_file_path = tempfile.mkstemp(dir=cache_path, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_path, cache_file_path)
+    except BaseException:
+        os.unlink(temp_file_path)
+        raise
+    print(f'Device data cached in: {cache_file_path}')
 
-def generate_readme_top10(wiki_commit_dates, devices):
+    return result
+
+
+def generate_readme_top10(newest_commit_date, sorted_devices):
     lines = []
 
-    for device in sorted(devices)[:10]:
+    for device in sorted_devices[:10]:
         lines.append(
             f'* [[{device.lineageos_wiki_link}|{device.short_name}]]'
             f' ({device.lineageos_data["maintainer_count"]} maintainers)'
         )
     lines.append('')
 
-    newest_commit_date = max(wiki_commit_dates)
     lines.append(f'Last LineageOS wiki page update: {newest_commit_date}')
-    now = datetime.datetime.now()
-    lines.append(f'Generated: {now.strftime("%Y-%m-%d")}')
+    lines.append(f'Generated: {datetime.date.today().isoformat()}')
 
     return lines
 
 
-def generate_csv(*, csv_file_path, filename_template, wiki_devices_path, lineageos_versions, readme_path):
+def generate_csv(
+    *, csv_file_path, filename_template, wiki_devices_path, lineageos_versions, readme_path, cache_path=None
+):
     assert isinstance(csv_file_path, Path)
     assert isinstance(wiki_devices_path, Path)
     assert isinstance(readme_path, Path)
+    assert cache_path is None or isinstance(cache_path, Path)
+
+    if not LIBYAML:
+        print('Hint: PyYAML was installed without libyaml, parsing the YAML files is much slower!')
 
     print(f'Read WIKI divice files from: {wiki_devices_path}')
     assert wiki_devices_path.is_dir(), f'ERROR: Path not found: {wiki_devices_path}'
@@ -234,80 +501,77 @@ def generate_csv(*, csv_file_path, filename_template, wiki_devices_path, lineage
     csv_file_path = csv_file_path.resolve()
 
     print(f'Generate: {csv_file_path}')
-    log.info('Generate csv on %s+0000', datetime.datetime.utcnow())
+    log.info('Generate csv on %s', datetime.datetime.now(datetime.timezone.utc).isoformat())
 
     ##################################################################
     # read LineageOS Wiki files:
 
-    devices = []
-    wiki_commit_dates = []
-    for item in wiki_devices_path.iterdir():
-        wiki_commit_date = get_git_commit_date(wiki_devices_path, item)
-        wiki_commit_dates.append(wiki_commit_date)
+    device_datas, commit_dates = load_wiki_devices(wiki_devices_path, lineageos_versions, cache_path)
 
-        device = Device(lineageos_versions, wiki_commit_date=wiki_commit_date)
+    devices = []
+    newest_commit_date = ''  # ISO dates: string comparison is fine
+    for file_name, device_data in sorted(device_datas, key=lambda item: item[0]):  # sorted for a stable log
+        wiki_commit_date = commit_dates.get(file_name, '')
+        if wiki_commit_date > newest_commit_date:
+            newest_commit_date = wiki_commit_date
 
-        with item.open('r', encoding='utf-8') as ymlfile:
-            device_data = load(ymlfile, Loader=Loader)
+        if isinstance(device_data, SkippedDevice):
+            log.info('Skip %r: only: %r', device_data.short_name or file_name, lineageos_versions)
+            continue
 
+        device = Device(lineageos_versions, wiki_commit_date=wiki_commit_date)
         device.load_lineageos_wiki_data(data=device_data)
+        if device.skip_device():
+            continue
 
+        device.load_details()
         devices.append(device)
         # if len(devices) > 10: # only for developing!
         #     break
 
+    print(f'Loaded {len(devices)} devices')
+
+    sorted_devices = sorted(devices, key=Device.sort_key)
+
     ##################################################################
     # save .cvs files:
 
     with MultiCsvFile(csv_file_path, filename_template, lineageos_versions) as multi_csv:
-        for device in sorted(devices):
+        for device in sorted_devices:
             print(device)
-            if device.skip_device():
-                continue
-
-            for version in device.filtered_lineageos_version:
-                multi_csv.add_device(version, device)
+            multi_csv.add_device(device.filtered_lineageos_version, device)
 
     ##################################################################
     # update TOP-10 in README:
 
-    readme_top10 = generate_readme_top10(wiki_commit_dates, devices)
+    readme_top10 = generate_readme_top10(newest_commit_date, sorted_devices)
     print('-' * 100)
     print('\n'.join(readme_top10))
     print('-' * 100)
 
-    new_readme = []
-    top10_found = False
-    in_top10 = False
-    with readme_path.open('r') as f:
-        for line in f:
-            line = line.rstrip()
-            if not in_top10:
-                new_readme.append(line)
-                if line == README_TOP10_HEADLINE:
-                    top10_found = True
-                    new_readme.append('')
-                    new_readme += readme_top10
-                    new_readme.append('')
-                    in_top10 = True
-            elif line.startswith('=='):
-                new_readme.append(line)
-                in_top10 = False
-
-    assert top10_found, 'replace top10 in readme failed!'
-    new_readme = '\n'.join(new_readme)
+    new_top10_section = '\n'.join([README_TOP10_HEADLINE, '', *readme_top10, '', ''])
+
+    readme = readme_path.read_text()
+    new_readme, count = README_TOP10_RE.subn(lambda match: new_top10_section, readme)
+    assert count == 1, 'replace top10 in readme failed!'
     # print(new_readme)
-    with readme_path.open('w') as f:
-        f.write(new_readme)
+    readme_path.write_text(new_readme)
 
 
 if __name__ == '__main__':
+    # Note: Not on module level, because worker processes may import this module, too.
+    logging.basicConfig(
+        level=logging.DEBUG,
+        filename='device_info.log',
+        filemode='w',
+    )
     generate_csv(
         csv_file_path=Path('.'),
         filename_template='device_info_{version}.csv',
         wiki_devices_path=Path('lineage_wiki/_data/devices'),
         lineageos_versions=LINEAGE_OS_VERSIONS,
         readme_path=Path('./README.creole'),
+        cache_path=Path('./.cache'),
     )
     print()
     print('---END---')